@@ -2,13 +2,27 @@
 Sentinel-ML Deep Scan API v2.0
 Calibrated, uncertainty-aware scam detection
 """
-from fastapi import FastAPI
+from anyio import to_thread
+from collections import OrderedDict
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+import asyncio
 import joblib
+import operator
+from numba import njit
 import numpy as np
+import onnxruntime as ort
 import os
 import json
+import tl2cgen
+import xgboost as xgb
 
-app = FastAPI(title="Sentinel-ML Deep Scan API", version="2.0-calibrated")
+app = FastAPI(
+    title="Sentinel-ML Deep Scan API",
+    version="2.0-calibrated",
+    default_response_class=ORJSONResponse
+)
 
 # Define base dir relative to this script: api/ -> sentinel-ml/
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -17,34 +31,337 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 schema_path = os.path.join(BASE_DIR, "models", "feature_schema.json")
 with open(schema_path, 'r') as f:
     FEATURE_SCHEMA = json.load(f)
-FEATURE_COLS = FEATURE_SCHEMA['features']
+FEATURE_COLS = tuple(FEATURE_SCHEMA['features'])
+N_FEATURES = len(FEATURE_COLS)
+MODEL_VERSION = FEATURE_SCHEMA.get('version', 'calibrated-v2.0')
+CALIBRATION = FEATURE_SCHEMA.get('calibration', 'none')
+
+# Fetches all feature values from a request dict in one C-level call
+FEATURE_GETTER = operator.itemgetter(*FEATURE_COLS)
+
+# Risk factors reported in the verdict reason:
+# (feature, threshold, text, value used when the key is missing)
+# A negative threshold flags values below abs(threshold)
+REASON_FACTORS = [
+    ('owner_privilege_ratio', 0.5, "owner-restricted execution paths", 0.0),
+    ('time_variance_score', 0.5, "time-based restrictions", 0.0),
+    ('gated_branch_ratio', 0.5, "access-gated branches", 0.0),
+    ('counterfactual_risk', 0.5, "counterfactual risk detected", 0.0),
+    ('gas_anomaly_score', 0.5, "gas usage anomalies", 0.0),
+    ('revert_rate', 0.7, "high revert rate", 0.0),
+    ('sim_success_rate', -0.3, "low simulation success", 1.0),
+]
+FACTOR_IDX = np.array([FEATURE_COLS.index(col) for col, _, _, _ in REASON_FACTORS])
+FACTOR_THRESH = np.array([thresh for _, thresh, _, _ in REASON_FACTORS], dtype=np.float32)
+FACTOR_SIGN = np.sign(FACTOR_THRESH)
+FACTOR_TEXT = [text for _, _, text, _ in REASON_FACTORS]
+# Missing keys already read as 0.0 in the feature vector, so only the
+# factors whose default differs need patching
+FACTOR_DEFAULTS = [
+    (i, col, default)
+    for i, (col, _, _, default) in enumerate(REASON_FACTORS)
+    if default != 0.0
+]
+
+# Response precision for [scam_probability, uncertainty, ci_low, ci_high]
+ROUND_SCALE = np.array([1e4, 1e3, 1e3, 1e3])
+
+# Labels indexed by the verdict / band ids returned from postprocess();
+# an id is the number of ascending thresholds the probability exceeds
+VERDICT_THRESH = np.array([0.4, 0.7])
+VERDICTS = ("SAFE", "WARN", "BLOCK")
+RISK_LEVELS = ("low_risk", "medium_risk", "high_risk")
+BAND_THRESH = np.array([0.3, 0.6])
+RISK_BANDS = ("LOW", "MEDIUM", "HIGH")
+
+
+def load_onnx_session(path: str) -> ort.InferenceSession:
+    """ONNX Runtime session tuned for per-worker serving"""
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    # One thread per session: concurrency comes from workers, not intra-op threads
+    sess_options.intra_op_num_threads = 1
+    return ort.InferenceSession(path, sess_options=sess_options, providers=["CPUExecutionProvider"])
+
 
 # Load Model 1: Calibrated Scam Classifier
+# Fastest available artefact from ml/export_models.py wins:
+#   1. single booster + frozen calibration table, compiled by Treelite
+#      (falling back to the XGBoost booster itself); only written when it
+#      matches the ensemble on a held-out split
+#   2. ONNX Runtime, preferring the int8-quantized model
+#   3. the sklearn CalibratedClassifierCV pickle
+booster_lib_path = os.path.join(BASE_DIR, "models", "scam_booster.so")
+booster_path = os.path.join(BASE_DIR, "models", "scam_booster.json")
+calib_lut_path = os.path.join(BASE_DIR, "models", "calib_lut.npy")
+calibrated_int8_path = os.path.join(BASE_DIR, "models", "calibrated_classifier_int8.onnx")
+calibrated_onnx_path = os.path.join(BASE_DIR, "models", "calibrated_classifier.onnx")
 calibrated_path = os.path.join(BASE_DIR, "models", "calibrated_classifier.pkl")
-scam_classifier = joblib.load(calibrated_path)
+# The int8 file only exists when export_models.py found something to quantize
+if os.path.exists(calibrated_int8_path):
+    scam_onnx_path = calibrated_int8_path
+else:
+    scam_onnx_path = calibrated_onnx_path
+scam_predictor = None
+scam_booster = None
+calib_lut = None
+scam_session = None
+scam_classifier = None
+if os.path.exists(calib_lut_path) and os.path.exists(booster_lib_path):
+    scam_predictor = tl2cgen.Predictor(booster_lib_path, nthread=1)
+    calib_lut = np.load(calib_lut_path)
+elif os.path.exists(calib_lut_path) and os.path.exists(booster_path):
+    scam_booster = xgb.Booster()
+    scam_booster.load_model(booster_path)
+    scam_booster.set_param({"nthread": 1})
+    calib_lut = np.load(calib_lut_path)
+elif os.path.exists(scam_onnx_path):
+    # ONNX sessions keep their weights in native buffers that Python never
+    # touches, so when loaded in the gunicorn master (preload_app) they stay
+    # copy-on-write shared across workers, unlike unpickled sklearn objects
+    scam_session = load_onnx_session(scam_onnx_path)
+else:
+    # Uncompressed pickles are memory-mapped so forked workers share pages
+    scam_classifier = joblib.load(calibrated_path, mmap_mode="r")
 
-# Load Model 2: Drift Detector (Isolation Forest) - unchanged
+# Load Model 2: Drift Detector (Isolation Forest)
+# ONNX-first like Model 1; drift_detector.onnx only exists when its labels
+# matched sklearn's during export
+drift_onnx_path = os.path.join(BASE_DIR, "models", "drift_detector.onnx")
 drift_detector_path = os.path.join(BASE_DIR, "models", "drift_detector.pkl")
-drift_detector = joblib.load(drift_detector_path)
+drift_session = None
+drift_detector = None
+if os.path.exists(drift_onnx_path):
+    drift_session = load_onnx_session(drift_onnx_path)
+else:
+    drift_detector = joblib.load(drift_detector_path, mmap_mode="r")
+    # Trained with n_jobs=-1; serving parallelism comes from workers instead
+    drift_detector.set_params(n_jobs=1)
+
+# Request coalescing: concurrent requests are queued and scored together
+# in a single model call (flushed when full or after the batch window)
+MAX_BATCH = 64
+BATCH_WINDOW_S = 0.005
+
+# Largest payload accepted by /analyze_batch
+MAX_BATCH_ITEMS = 1024
+
+scam_queue = None
+drift_queue = None
+batcher_tasks = []
+
+
+@njit(cache=True)
+def postprocess(scam_prob):
+    """Uncertainty, confidence interval, verdict id and risk band id for one probability"""
+    # Calculate uncertainty based on distance from decision boundary
+    # Probabilities near 0.5 have higher uncertainty
+    uncertainty = 1.0 - abs(scam_prob - 0.5) * 2
+    
+    # Confidence interval (simple approximation)
+    # Width increases with uncertainty
+    ci_width = 0.1 + uncertainty * 0.15
+    ci_low = max(0.0, scam_prob - ci_width / 2)
+    ci_high = min(1.0, scam_prob + ci_width / 2)
+    
+    # Verdict based on calibrated probability thresholds
+    # These thresholds are applied AFTER probability estimation
+    # Counting exceeded thresholds avoids unpredictable if/elif branches
+    verdict_id = (scam_prob > VERDICT_THRESH).sum()
+    band_id = (scam_prob > BAND_THRESH).sum()
+    
+    return scam_prob, uncertainty, ci_low, ci_high, verdict_id, band_id
+
+
+# Serial on purpose: this runs on threadpool threads, and Numba's parallel
+# threading layers are not safe to enter from several threads at once
+@njit(cache=True)
+def postprocess_batch(scam_probs):
+    """postprocess() over a vector: (n, 4) [prob, unc, ci_low, ci_high] and (n, 2) [verdict, band]"""
+    n = scam_probs.shape[0]
+    values = np.empty((n, 4), dtype=np.float64)
+    ids = np.empty((n, 2), dtype=np.int64)
+    for i in range(n):
+        prob, unc, ci_low, ci_high, verdict_id, band_id = postprocess(scam_probs[i])
+        values[i, 0] = prob
+        values[i, 1] = unc
+        values[i, 2] = ci_low
+        values[i, 3] = ci_high
+        ids[i, 0] = verdict_id
+        ids[i, 1] = band_id
+    return values, ids
+
+
+def feature_values(data: dict) -> tuple:
+    """Raw feature values in FEATURE_COLS order (missing features default to 0.0)"""
+    try:
+        return FEATURE_GETTER(data)
+    except KeyError:
+        return tuple(data.get(col, 0.0) for col in FEATURE_COLS)
+
+
+def to_features(values) -> np.ndarray:
+    """float32 feature row/matrix; 422 on non-numeric or non-finite values (e.g. JSON null)"""
+    # Validated as float64 so large-but-finite inputs still clip to 1.0 later
+    try:
+        features = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError, OverflowError):
+        raise HTTPException(status_code=422, detail="Features must be numbers")
+    if not np.isfinite(features).all():
+        raise HTTPException(status_code=422, detail="Features must be finite numbers")
+    return features.astype(np.float32)
+
+
+def predict_scam(batch: np.ndarray) -> np.ndarray:
+    """Calibrated scam probability for each row of a (n, 15) batch"""
+    if calib_lut is not None:
+        # One tree walk, then look up the calibrated value for the raw bin
+        if scam_predictor is not None:
+            raw = scam_predictor.predict(tl2cgen.DMatrix(batch)).reshape(-1)
+        else:
+            raw = scam_booster.inplace_predict(batch)
+        return calib_lut[np.minimum((raw * len(calib_lut)).astype(np.int32), len(calib_lut) - 1)]
+    if scam_session is not None:
+        # Outputs are [label, probabilities]
+        return scam_session.run(None, {"X": batch})[1][:, 1]
+    return scam_classifier.predict_proba(batch)[:, 1]
+
+
+def predict_drift(batch: np.ndarray) -> np.ndarray:
+    """Drift prediction (1 normal, -1 anomaly) for each row of a (n, 4) batch"""
+    if drift_session is not None:
+        # Outputs are [label, scores]
+        return drift_session.run(None, {"X": batch})[0].ravel()
+    return drift_detector.predict(batch)
+
+
+async def batcher(queue: asyncio.Queue, predict, buffer: np.ndarray):
+    """Drain pending (row, future) pairs and resolve them from one predict call"""
+    loop = asyncio.get_running_loop()
+    while True:
+        row, fut = await queue.get()
+        rows, futures = [row], [fut]
+        deadline = loop.time() + BATCH_WINDOW_S
+
+        while len(rows) < MAX_BATCH:
+            if queue.empty():
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    row, fut = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                row, fut = queue.get_nowait()
+            rows.append(row)
+            futures.append(fut)
+
+        # Pack into the preallocated buffer; it is only refilled after the
+        # predict call below returns, so one buffer per queue is enough
+        n = len(rows)
+        for i, row in enumerate(rows):
+            buffer[i] = row
+
+        # Run the model off the event loop so new requests keep queuing
+        try:
+            results = await run_in_threadpool(predict, buffer[:n])
+        except Exception as exc:
+            for fut in futures:
+                if not fut.done():
+                    fut.set_exception(exc)
+            continue
+
+        for fut, result in zip(futures, results):
+            # Skip requests whose client went away while we were scoring
+            if not fut.done():
+                fut.set_result(result)
+
+
+async def enqueue(queue: asyncio.Queue, row: np.ndarray):
+    """Queue a single feature row and wait for its batched prediction"""
+    fut = asyncio.get_running_loop().create_future()
+    queue.put_nowait((row, fut))
+    return await fut
+
+
+# Recent /analyze results keyed on the 8-bit quantized feature vector, so
+# rescans of the same (or a near-identical) contract skip the model entirely.
+# Models only load at import, so the cache never holds stale results.
+RESULT_CACHE_SIZE = 4096
+result_cache = OrderedDict()
+
+
+def cache_key(features: np.ndarray) -> bytes:
+    """Quantize clipped features to 8 bits so near-duplicates share a key"""
+    # NaN * 255 -> uint8 is undefined (in practice 0, colliding with 0.0), so
+    # callers must pass rows already checked by to_features()
+    return np.rint(features * 255).astype(np.uint8).tobytes()
+
+
+# Max threads used for model calls per worker. Cores are covered by one
+# worker per core (gunicorn.conf.py). Every handler is async, so the threads
+# only serve the two batchers (one call in flight each) and /analyze_batch
+THREADPOOL_SIZE = int(os.environ.get("SENTINEL_THREADPOOL_SIZE", 4))
+
+# Concurrent /analyze_batch calls allowed to hold threads; the rest wait so
+# the two batchers always find a free thread (given THREADPOOL_SIZE >= 3)
+BATCH_CONCURRENCY = max(1, THREADPOOL_SIZE - 2)
+batch_semaphore = None
+
+# Number of dummy inferences run at startup before serving traffic
+WARMUP_ROUNDS = 5
+
+
+@app.on_event("startup")
+async def limit_threadpool():
+    """Cap the threadpool that run_in_threadpool dispatches model calls to"""
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+
+@app.on_event("startup")
+def warmup_models():
+    """Run dummy inferences so the first real request doesn't pay cold-start cost"""
+    scam_dummy = np.zeros((1, N_FEATURES), dtype=np.float32)
+    drift_dummy = np.zeros((1, 4), dtype=np.float32)
+    for _ in range(WARMUP_ROUNDS):
+        predict_scam(scam_dummy)
+        predict_drift(drift_dummy)
+    # Compile (or load from cache) the post-processing kernels
+    postprocess(0.5)
+    postprocess_batch(np.full(1, 0.5, dtype=np.float64))
+
+
+@app.on_event("startup")
+async def start_batchers():
+    global scam_queue, drift_queue, batch_semaphore
+    scam_queue = asyncio.Queue()
+    drift_queue = asyncio.Queue()
+    batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    scam_buffer = np.empty((MAX_BATCH, N_FEATURES), dtype=np.float32)
+    drift_buffer = np.empty((MAX_BATCH, 4), dtype=np.float32)
+    batcher_tasks.append(asyncio.create_task(batcher(scam_queue, predict_scam, scam_buffer)))
+    batcher_tasks.append(asyncio.create_task(batcher(drift_queue, predict_drift, drift_buffer)))
 
 
 @app.get("/")
-def root():
+async def root():
     return {
         "service": "Sentinel-ML Deep Scan API",
         "version": "2.0-calibrated",
-        "model_version": FEATURE_SCHEMA.get('version', 'unknown'),
-        "calibration": FEATURE_SCHEMA.get('calibration', 'none'),
-        "features": len(FEATURE_COLS),
+        "model_version": MODEL_VERSION,
+        "calibration": CALIBRATION,
+        "features": N_FEATURES,
         "endpoints": {
             "/analyze": "Deep Scan (15 continuous features, calibrated)",
+            "/analyze_batch": "Batch Deep Scan (list of /analyze payloads)",
             "/check_drift": "Drift Detection (4 features)"
         }
     }
 
 
 @app.post("/analyze")
-def deep_scan(data: dict):
+async def deep_scan(data: dict):
     """
     Deep Scan Endpoint - Calibrated Ensemble Analysis
     
@@ -78,71 +395,113 @@ def deep_scan(data: dict):
         "model_version": string
     }
     """
-    # Extract features in the correct order
-    features = []
-    for col in FEATURE_COLS:
-        value = data.get(col, 0.0)
-        # Ensure value is in valid range
-        value = max(0.0, min(1.0, float(value)))
-        features.append(value)
+    # Extract features in the correct order (422 on non-finite values, so
+    # NaN never reaches cache_key below)
+    classifier_features = to_features(feature_values(data))
+    # Ensure values are in valid range
+    np.clip(classifier_features, 0.0, 1.0, out=classifier_features)
+    factor_values = reason_values(data, classifier_features)
     
-    classifier_features = np.array([features], dtype=np.float32)
+    # The reason depends on which keys were present, so key on both rows
+    key = cache_key(classifier_features) + cache_key(factor_values)
+    cached = result_cache.get(key)
+    if cached is not None:
+        result_cache.move_to_end(key)
+        return cached
     
-    # Get calibrated probability
-    scam_prob = scam_classifier.predict_proba(classifier_features)[0][1]
+    # Get calibrated probability (scored together with concurrent requests)
+    scam_prob = await enqueue(scam_queue, classifier_features)
     
-    # Calculate uncertainty based on distance from decision boundary
-    # Probabilities near 0.5 have higher uncertainty
-    uncertainty = 1.0 - abs(scam_prob - 0.5) * 2
+    # Uncertainty, confidence interval and verdict in one compiled kernel
+    scam_prob, uncertainty, ci_low, ci_high, verdict_id, band_id = postprocess(float(scam_prob))
+    values = round_values(np.array([scam_prob, uncertainty, ci_low, ci_high]))
+    result = build_result(factor_values, *values, verdict_id, band_id)
     
-    # Confidence interval (simple approximation)
-    # Width increases with uncertainty
-    ci_width = 0.1 + uncertainty * 0.15
-    ci_low = max(0.0, scam_prob - ci_width / 2)
-    ci_high = min(1.0, scam_prob + ci_width / 2)
+    result_cache[key] = result
+    if len(result_cache) > RESULT_CACHE_SIZE:
+        result_cache.popitem(last=False)
+    return result
+
+
+@app.post("/analyze_batch")
+async def deep_scan_batch(data: dict):
+    """
+    Batch Deep Scan Endpoint - scores many contracts in one model call
     
-    # Verdict based on calibrated probability thresholds
-    # These thresholds are applied AFTER probability estimation
-    if scam_prob > 0.7:
-        verdict = "BLOCK"
-        reason = generate_reason(data, "high_risk")
-    elif scam_prob > 0.4:
-        verdict = "WARN"
-        reason = generate_reason(data, "medium_risk")
-    else:
-        verdict = "SAFE"
-        reason = generate_reason(data, "low_risk")
+    Input Schema:
+    {
+        "items": [ {15 features, same as /analyze}, ... ]   # at most MAX_BATCH_ITEMS
+    }
     
+    Output: list of /analyze results, in input order
+    """
+    items = data.get("items", [])
+    if not isinstance(items, list):
+        raise HTTPException(status_code=422, detail="items must be a list")
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_ITEMS} items per batch")
+    if not items:
+        return []
+    
+    # Packing, scoring and post-processing all run off the event loop so a
+    # large batch doesn't stall /analyze, /check_drift or the batchers
+    async with batch_semaphore:
+        return await run_in_threadpool(score_batch, items)
+
+
+def score_batch(items: list) -> list:
+    """Score an /analyze_batch payload with one model call"""
+    if not all(isinstance(item, dict) for item in items):
+        raise HTTPException(status_code=422, detail="Each item must be an object")
+    
+    # Pack all feature vectors into one (n, 15) matrix
+    matrix = to_features([feature_values(item) for item in items])
+    # Ensure values are in valid range
+    np.clip(matrix, 0.0, 1.0, out=matrix)
+    
+    scam_probs = predict_scam(matrix)
+    values, ids = postprocess_batch(scam_probs.astype(np.float64))
+    
+    return [
+        build_result(reason_values(item, row), *row_values, *row_ids)
+        for item, row, row_values, row_ids in zip(items, matrix, round_values(values), ids.tolist())
+    ]
+
+
+def round_values(values: np.ndarray) -> list:
+    """Round [prob, unc, ci_low, ci_high] rows to response precision in one pass"""
+    return (np.rint(values * ROUND_SCALE) / ROUND_SCALE).tolist()
+
+
+def build_result(factor_values: np.ndarray, scam_prob: float, uncertainty: float,
+                 ci_low: float, ci_high: float, verdict_id: int, band_id: int) -> dict:
+    """Build the response body for one scored feature vector"""
     return {
-        "verdict": verdict,
-        "scam_probability": round(float(scam_prob), 4),
+        "verdict": VERDICTS[verdict_id],
+        "scam_probability": scam_prob,
         "calibrated": True,
-        "confidence_interval": [round(ci_low, 3), round(ci_high, 3)],
-        "uncertainty": round(float(uncertainty), 3),
-        "risk_band": "HIGH" if scam_prob > 0.6 else "MEDIUM" if scam_prob > 0.3 else "LOW",
-        "reason": reason,
-        "model_version": FEATURE_SCHEMA.get('version', 'calibrated-v2.0')
+        "confidence_interval": [ci_low, ci_high],
+        "uncertainty": uncertainty,
+        "risk_band": RISK_BANDS[band_id],
+        "reason": generate_reason(factor_values, RISK_LEVELS[verdict_id]),
+        "model_version": MODEL_VERSION
     }
 
 
-def generate_reason(data: dict, risk_level: str) -> str:
+def reason_values(data: dict, features: np.ndarray) -> np.ndarray:
+    """Pick the REASON_FACTORS values out of a clipped row, applying factor defaults"""
+    values = features[FACTOR_IDX]
+    for i, col, default in FACTOR_DEFAULTS:
+        if col not in data:
+            values[i] = default
+    return values
+
+
+def generate_reason(factor_values: np.ndarray, risk_level: str) -> str:
     """Generate human-readable reason based on top risk factors"""
-    factors = []
-    
-    if data.get('owner_privilege_ratio', 0) > 0.5:
-        factors.append("owner-restricted execution paths")
-    if data.get('time_variance_score', 0) > 0.5:
-        factors.append("time-based restrictions")
-    if data.get('gated_branch_ratio', 0) > 0.5:
-        factors.append("access-gated branches")
-    if data.get('counterfactual_risk', 0) > 0.5:
-        factors.append("counterfactual risk detected")
-    if data.get('gas_anomaly_score', 0) > 0.5:
-        factors.append("gas usage anomalies")
-    if data.get('revert_rate', 0) > 0.7:
-        factors.append("high revert rate")
-    if data.get('sim_success_rate', 1) < 0.3:
-        factors.append("low simulation success")
+    # One vectorized compare over the factor values
+    mask = factor_values * FACTOR_SIGN > FACTOR_THRESH
+    factors = [FACTOR_TEXT[i] for i in np.flatnonzero(mask)]
     
     if risk_level == "high_risk":
         if factors:
@@ -157,7 +516,7 @@ def generate_reason(data: dict, risk_level: str) -> str:
 
 
 @app.post("/check_drift")
-def check_drift(data: dict):
+async def check_drift(data: dict):
     """
     Drift Detection Endpoint (unchanged from v1)
     
@@ -169,16 +528,16 @@ def check_drift(data: dict):
         "Unique_Holders_Count": int
     }
     """
-    drift_features = np.array([[
+    drift_features = np.array([
         data["Sim_RiskScore"],
         data["Capability_Hash_Distance"],
         data["Liquidity_Amount"],
         data["Unique_Holders_Count"]
-    ]], dtype=np.float32)
+    ], dtype=np.float32)
     
     # Model 2: Drift Detector
     # Returns 1 for normal, -1 for anomaly
-    prediction = drift_detector.predict(drift_features)[0]
+    prediction = await enqueue(drift_queue, drift_features)
     is_anomaly = (prediction == -1)
     
     return {
@@ -190,10 +549,10 @@ def check_drift(data: dict):
 
 
 @app.get("/health")
-def health():
+async def health():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "model_loaded": scam_classifier is not None,
-        "version": FEATURE_SCHEMA.get('version', 'unknown')
+        "model_loaded": any(m is not None for m in (scam_predictor, scam_booster, scam_session, scam_classifier)),
+        "version": MODEL_VERSION
     }
@@ -0,0 +1,28 @@
+"""
+Gunicorn config for the Sentinel-ML Deep Scan API
+
+    gunicorn -c gunicorn.conf.py api.risk_api:app
+
+Model inference is CPU-bound and holds the GIL, so throughput comes from
+one worker process per core rather than from threads inside a worker.
+"""
+import gc
+import multiprocessing
+import os
+
+# One BLAS/OpenMP thread per worker; workers already cover every core
+for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMBA_NUM_THREADS"):
+    os.environ.setdefault(var, "1")
+
+bind = os.environ.get("SENTINEL_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("SENTINEL_WORKERS", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Load the models once in the master; forked workers share its pages
+preload_app = True
+
+
+def when_ready(server):
+    # Move everything loaded by preload_app into the permanent generation so
+    # the garbage collector never writes to (and un-shares) those pages
+    gc.freeze()
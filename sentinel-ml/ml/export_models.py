@@ -0,0 +1,368 @@
+"""
+Model Export Pipeline
+Converts the trained calibrated scam classifier (Model 1) and the drift
+detector (Model 2) to ONNX so the Deep Scan API can serve them through
+ONNX Runtime, plus an int8-quantized classifier when it stays within
+tolerance of the FP32 model.
+Also freezes Model 1 into a single XGBoost booster + calibration lookup
+table, and compiles that booster to a native library with Treelite
+(the API's fastest serving path).
+"""
+import os
+import json
+import joblib
+import numpy as np
+import onnx
+from onnxmltools.convert.xgboost.operator_converters.XGBoost import convert_xgboost
+from skl2onnx import convert_sklearn, update_registered_converter
+from skl2onnx.common.data_types import FloatTensorType
+from skl2onnx.common.shape_calculator import calculate_linear_classifier_output_shapes
+from sklearn.base import clone
+from sklearn.isotonic import IsotonicRegression
+from sklearn.model_selection import cross_val_predict, train_test_split
+from xgboost import XGBClassifier
+import xgboost as xgb
+import onnxruntime as ort
+from onnxruntime.quantization import quantize_dynamic, QuantType
+import tl2cgen
+import treelite
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+
+# Written by the backend's TrainingDataCollector
+TRAINING_DATA_PATH = os.path.join(BASE_DIR, "data", "training_samples_v2.json")
+
+# SAFE / WARN / BLOCK cut-offs used by the API, for verdict agreement gates
+VERDICT_THRESH = np.array([0.4, 0.7])
+
+# Gates for serving calibrated_classifier.onnx instead of the sklearn pickle
+ONNX_TOLERANCE = 0.01               # max |ONNX - sklearn| probability
+ONNX_VERDICT_AGREEMENT = 0.999      # min fraction of identical verdicts
+
+# Max allowed |int8 - fp32| probability difference on the held-out split
+QUANTIZATION_TOLERANCE = 0.01
+
+# Nodes quantize_dynamic inserts when it actually quantizes a weight
+QUANTIZED_OPS = {
+    'DynamicQuantizeLinear', 'QuantizeLinear', 'DequantizeLinear',
+    'MatMulInteger', 'ConvInteger', 'DynamicQuantizeMatMul', 'QGemm'
+}
+
+# Min fraction of probes where drift_detector.onnx must match sklearn's labels
+DRIFT_AGREEMENT_MIN = 0.99
+
+# Resolution of the frozen calibration table (raw probability bins)
+CALIB_LUT_SIZE = 1024
+
+# Gates for replacing the calibrated ensemble with the frozen booster,
+# measured on a held-out split the booster and calibrator never saw
+MIN_FREEZE_SAMPLES = 500
+FREEZE_TOLERANCE = 0.03             # max mean |frozen - ensemble| probability
+FREEZE_VERDICT_AGREEMENT = 0.98     # min fraction of identical SAFE/WARN/BLOCK verdicts
+
+# Max |Treelite - XGBoost| raw probability for serving scam_booster.so
+TREELITE_TOLERANCE = 1e-5
+
+# skl2onnx does not know XGBoost out of the box; borrow the onnxmltools
+# converter so the calibrated ensemble can wrap XGBClassifier estimators
+update_registered_converter(
+    XGBClassifier,
+    'XGBoostXGBClassifier',
+    calculate_linear_classifier_output_shapes,
+    convert_xgboost,
+    options={'nocl': [True, False], 'zipmap': [True, False, 'columns']}
+)
+
+
+def verdict_agreement(proba_a, proba_b):
+    """Fraction of rows where two probability vectors give the same verdict"""
+    return float(np.mean(
+        (proba_a[:, None] > VERDICT_THRESH).sum(axis=1)
+        == (proba_b[:, None] > VERDICT_THRESH).sum(axis=1)
+    ))
+
+
+def load_feature_cols():
+    """Feature order shared with the API"""
+    schema_path = os.path.join(MODELS_DIR, "feature_schema.json")
+    with open(schema_path, 'r') as f:
+        return json.load(f)['features']
+
+
+def load_training_samples(feature_cols):
+    """Collected (features, soft labels) as arrays, or (None, None) if there are none"""
+    if not os.path.exists(TRAINING_DATA_PATH):
+        return None, None
+    with open(TRAINING_DATA_PATH, 'r') as f:
+        samples = json.load(f)
+    X = np.array(
+        [[s['features'][col] for col in feature_cols] for s in samples],
+        dtype=np.float32
+    )
+    y = np.array([s['label'] for s in samples], dtype=np.float32)
+    return X, y
+
+
+def load_holdout(feature_cols):
+    """Held-out feature matrix from collected samples (random probes if none)"""
+    X, _ = load_training_samples(feature_cols)
+    if X is not None and len(X) >= 10:
+        _, X_test = train_test_split(X, test_size=0.2, random_state=42)
+        return X_test
+    print("  (no collected samples found, using random probes)")
+    return np.random.uniform(0.0, 1.0, size=(1000, len(feature_cols))).astype(np.float32)
+
+
+def export_calibrated_classifier():
+    """Convert calibrated_classifier.pkl to calibrated_classifier.onnx"""
+    print("\n" + "="*60)
+    print("EXPORTING MODEL 1: CALIBRATED CLASSIFIER (ONNX)")
+    print("="*60)
+
+    feature_cols = load_feature_cols()
+    model = joblib.load(os.path.join(MODELS_DIR, "calibrated_classifier.pkl"))
+
+    # zipmap=False keeps probabilities as a plain (n, 2) tensor; the tree
+    # converters only support the ai.onnx.ml v3 operators
+    onnx_model = convert_sklearn(
+        model,
+        initial_types=[('X', FloatTensorType([None, len(feature_cols)]))],
+        options={id(model): {'zipmap': False}},
+        target_opset={'': 15, 'ai.onnx.ml': 3}
+    )
+
+    onnx_path = os.path.join(MODELS_DIR, "calibrated_classifier.onnx")
+    with open(onnx_path, 'wb') as f:
+        f.write(onnx_model.SerializeToString())
+    print(f"✓ Model saved to: {onnx_path}")
+
+    # ONNX Runtime must agree with sklearn before the API may serve it
+    probe = np.random.uniform(0.0, 1.0, size=(20000, len(feature_cols))).astype(np.float32)
+    session = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+    onnx_proba = session.run(None, {'X': probe})[1][:, 1]
+    sklearn_proba = model.predict_proba(probe)[:, 1]
+    max_diff = float(np.max(np.abs(onnx_proba - sklearn_proba)))
+    agreement = verdict_agreement(onnx_proba, sklearn_proba)
+    print(f"Max |ONNX - sklearn| probability difference: {max_diff:.6f}")
+    print(f"ONNX / sklearn verdict agreement: {agreement:.4f}")
+
+    if max_diff > ONNX_TOLERANCE or agreement < ONNX_VERDICT_AGREEMENT:
+        # The API falls back to the sklearn pickle; drop any int8 model
+        # derived from an earlier export as well
+        int8_path = os.path.join(MODELS_DIR, "calibrated_classifier_int8.onnx")
+        for path in (onnx_path, int8_path):
+            if os.path.exists(path):
+                os.remove(path)
+        print(f"❌ Drift above {ONNX_TOLERANCE} or verdict agreement below {ONNX_VERDICT_AGREEMENT}, ONNX model discarded")
+        return None
+
+    return onnx_path
+
+
+def quantize_calibrated_classifier(onnx_path):
+    """Quantize the ONNX classifier to int8 and keep it only if drift is acceptable"""
+    print("\n" + "="*60)
+    print("QUANTIZING MODEL 1: CALIBRATED CLASSIFIER (INT8)")
+    print("="*60)
+
+    feature_cols = load_feature_cols()
+    int8_path = os.path.join(MODELS_DIR, "calibrated_classifier_int8.onnx")
+    quantize_dynamic(
+        model_input=onnx_path,
+        model_output=int8_path,
+        weight_type=QuantType.QInt8
+    )
+
+    # Tree-ensemble and calibration nodes are never quantized; don't ship a
+    # copy of the FP32 graph under the int8 name
+    graph = onnx.load(int8_path).graph
+    n_quantized = sum(node.op_type in QUANTIZED_OPS for node in graph.node)
+    print(f"Quantized nodes: {n_quantized}")
+    if n_quantized == 0:
+        os.remove(int8_path)
+        print("❌ Nothing to quantize in this graph, int8 model discarded")
+        return None
+
+    # Compare against the FP32 model on the held-out split
+    X_test = load_holdout(feature_cols)
+    fp32 = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+    int8 = ort.InferenceSession(int8_path, providers=['CPUExecutionProvider'])
+    fp32_proba = fp32.run(None, {'X': X_test})[1][:, 1]
+    int8_proba = int8.run(None, {'X': X_test})[1][:, 1]
+    diff = np.abs(int8_proba - fp32_proba)
+    print(f"Held-out samples: {len(X_test)}")
+    print(f"Probability drift: mean {diff.mean():.6f}, max {diff.max():.6f}")
+
+    if diff.max() > QUANTIZATION_TOLERANCE:
+        # The API falls back to the FP32 model; recalibrate before retrying
+        os.remove(int8_path)
+        print(f"❌ Drift exceeds {QUANTIZATION_TOLERANCE}, int8 model discarded")
+        return None
+
+    print(f"✓ Model saved to: {int8_path}")
+    return int8_path
+
+
+def export_drift_detector():
+    """Convert drift_detector.pkl to drift_detector.onnx"""
+    print("\n" + "="*60)
+    print("EXPORTING MODEL 2: DRIFT DETECTOR (ONNX)")
+    print("="*60)
+
+    model = joblib.load(os.path.join(MODELS_DIR, "drift_detector.pkl"))
+
+    # IsolationForest needs the ai.onnx.ml v3 tree operators
+    onnx_model = convert_sklearn(
+        model,
+        initial_types=[('X', FloatTensorType([None, 4]))],
+        target_opset={'': 15, 'ai.onnx.ml': 3}
+    )
+
+    onnx_path = os.path.join(MODELS_DIR, "drift_detector.onnx")
+    with open(onnx_path, 'wb') as f:
+        f.write(onnx_model.SerializeToString())
+    print(f"✓ Model saved to: {onnx_path}")
+
+    # Sanity check on stable and anomalous-looking probes
+    probe = np.column_stack([
+        np.random.uniform(0.0, 1.0, 1000),
+        np.random.randint(0, 2, 1000),
+        np.random.uniform(0, 500000, 1000),
+        np.random.randint(100, 1000, 1000)
+    ]).astype(np.float32)
+    session = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+    onnx_labels = session.run(None, {'X': probe})[0].ravel()
+    agreement = float(np.mean(onnx_labels == model.predict(probe)))
+    print(f"ONNX / sklearn label agreement: {agreement:.4f}")
+
+    if agreement < DRIFT_AGREEMENT_MIN:
+        # The API falls back to the sklearn pickle
+        os.remove(onnx_path)
+        print(f"❌ Agreement below {DRIFT_AGREEMENT_MIN}, ONNX model discarded")
+        return None
+
+    return onnx_path
+
+
+def freeze_calibration():
+    """Retrain Model 1 as one XGBoost booster plus a frozen isotonic lookup table"""
+    print("\n" + "="*60)
+    print("FREEZING MODEL 1: SINGLE BOOSTER + CALIBRATION TABLE")
+    print("="*60)
+
+    booster_path = os.path.join(MODELS_DIR, "scam_booster.json")
+    lut_path = os.path.join(MODELS_DIR, "calib_lut.npy")
+    lib_path = os.path.join(MODELS_DIR, "scam_booster.so")
+
+    def discard(message):
+        # Remove artefacts from earlier runs too, so the API falls back to
+        # ONNX / the pickle instead of serving an unvalidated booster
+        for path in (booster_path, lut_path, lib_path):
+            if os.path.exists(path):
+                os.remove(path)
+        print(f"❌ {message}, frozen model discarded")
+        return None
+
+    feature_cols = load_feature_cols()
+    X, soft_labels = load_training_samples(feature_cols)
+    if X is None or len(X) < MIN_FREEZE_SAMPLES:
+        return discard(f"Fewer than {MIN_FREEZE_SAMPLES} collected samples in {TRAINING_DATA_PATH}")
+    y = (soft_labels > 0.5).astype(int)
+    if len(np.unique(y)) < 2:
+        return discard("Collected samples contain a single class")
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+    print(f"  Training: {len(X_train)} samples")
+    print(f"  Held-out: {len(X_test)} samples")
+
+    # Same XGBoost settings as the calibrated ensemble's base estimator
+    calibrated = joblib.load(os.path.join(MODELS_DIR, "calibrated_classifier.pkl"))
+    params = calibrated.get_params()
+    base = params.get('estimator') or params.get('base_estimator')
+
+    # Isotonic map fitted on out-of-fold raw probabilities, as CalibratedClassifierCV does
+    raw_oof = cross_val_predict(clone(base), X_train, y_train, cv=5, method='predict_proba')[:, 1]
+    isotonic = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip')
+    isotonic.fit(raw_oof, y_train)
+
+    # One booster on the training split replaces the K fold estimators
+    model = clone(base)
+    model.fit(X_train, y_train)
+
+    # Bake the calibrator into a table indexed by int(raw_prob * CALIB_LUT_SIZE)
+    grid = (np.arange(CALIB_LUT_SIZE) + 0.5) / CALIB_LUT_SIZE
+    calib_lut = isotonic.predict(grid).astype(np.float32)
+
+    # Compare with the calibrated ensemble on the held-out split
+    raw = model.get_booster().inplace_predict(X_test)
+    frozen_proba = calib_lut[np.minimum((raw * CALIB_LUT_SIZE).astype(np.int32), CALIB_LUT_SIZE - 1)]
+    ensemble_proba = calibrated.predict_proba(X_test)[:, 1]
+    diff = np.abs(frozen_proba - ensemble_proba)
+    agreement = verdict_agreement(frozen_proba, ensemble_proba)
+    print(f"Frozen vs ensemble probability difference: mean {diff.mean():.6f}, max {diff.max():.6f}")
+    print(f"Frozen vs ensemble verdict agreement: {agreement:.4f}")
+
+    if diff.mean() > FREEZE_TOLERANCE:
+        return discard(f"Mean drift exceeds {FREEZE_TOLERANCE}")
+    if agreement < FREEZE_VERDICT_AGREEMENT:
+        return discard(f"Verdict agreement below {FREEZE_VERDICT_AGREEMENT}")
+
+    # The API prefers scam_booster.so and pairs it with calib_lut.npy, so a
+    # library compiled from an older booster must not outlive this one
+    if os.path.exists(lib_path):
+        os.remove(lib_path)
+    model.get_booster().save_model(booster_path)
+    np.save(lut_path, calib_lut)
+    print(f"✓ Booster saved to: {booster_path}")
+    print(f"✓ Calibration table saved to: {lut_path}")
+
+    return booster_path, lut_path
+
+
+def compile_booster(booster_path):
+    """Compile the frozen booster to scam_booster.so (tree walk as generated C)"""
+    print("\n" + "="*60)
+    print("COMPILING MODEL 1: TREELITE NATIVE LIBRARY")
+    print("="*60)
+
+    model = treelite.frontend.load_xgboost_model(booster_path)
+    lib_path = os.path.join(MODELS_DIR, "scam_booster.so")
+    # Build next to the final path and only move it into place once checked
+    tmp_path = os.path.join(MODELS_DIR, "scam_booster.tmp.so")
+    tl2cgen.export_lib(
+        model,
+        toolchain='gcc',
+        libpath=tmp_path,
+        params={'parallel_comp': 8}
+    )
+
+    # Sanity check: compiled trees must agree with XGBoost
+    feature_cols = load_feature_cols()
+    probe = np.random.uniform(0.0, 1.0, size=(1000, len(feature_cols))).astype(np.float32)
+    booster = xgb.Booster()
+    booster.load_model(booster_path)
+    compiled = tl2cgen.Predictor(tmp_path).predict(tl2cgen.DMatrix(probe)).reshape(-1)
+    max_diff = float(np.max(np.abs(compiled - booster.inplace_predict(probe))))
+    print(f"Max |Treelite - XGBoost| raw probability difference: {max_diff:.6f}")
+
+    if max_diff > TREELITE_TOLERANCE:
+        os.remove(tmp_path)
+        print(f"❌ Difference exceeds {TREELITE_TOLERANCE}, library discarded")
+        return None
+
+    os.replace(tmp_path, lib_path)
+    print(f"✓ Library saved to: {lib_path}")
+    return lib_path
+
+
+if __name__ == "__main__":
+    onnx_path = export_calibrated_classifier()
+    if onnx_path is not None:
+        quantize_calibrated_classifier(onnx_path)
+    export_drift_detector()
+    frozen = freeze_calibration()
+    if frozen is not None:
+        compile_booster(frozen[0])
@@ -24,43 +24,38 @@ def generate_drift_data(n_samples=1000):
     """Generate synthetic contract history data for drift detection"""
     print(f"Generating {n_samples} training samples for drift detection...")
     
-    data = []
-    
     # 1. STABLE CONTRACTS (Normal) - 90%
-    for _ in range(int(n_samples * 0.9)):
-        sample = {
-            'Sim_RiskScore': np.random.uniform(0.0, 0.3),          # Low risk
-            'Capability_Hash_Distance': 0,                        # No code change
-            'Liquidity_Amount': np.random.uniform(100000, 500000),# Stable liquidity
-            'Unique_Holders_Count': np.random.randint(100, 1000), # Normal holders
-            'is_anomaly': 0
-        }
-        # Add slight natural variance
-        data.append(sample)
-
     # 2. ANOMALIES (Drift) - 10%
-    for _ in range(int(n_samples * 0.1)):
-        # Randomly choose anomaly type
-        drift_type = np.random.choice(['risk_spike', 'code_change', 'rug_pull'])
-        
-        sample = {
-            'Sim_RiskScore': np.random.uniform(0.0, 0.3),
-            'Capability_Hash_Distance': 0,
-            'Liquidity_Amount': np.random.uniform(100000, 500000),
-            'Unique_Holders_Count': np.random.randint(100, 1000),
-            'is_anomaly': 1
-        }
-        
-        if drift_type == 'risk_spike':
-            sample['Sim_RiskScore'] = np.random.uniform(0.7, 1.0)
-        elif drift_type == 'code_change':
-            sample['Capability_Hash_Distance'] = 1
-        elif drift_type == 'rug_pull':
-            sample['Liquidity_Amount'] = np.random.uniform(0, 1000) # Liquidity drained
-            
-        data.append(sample)
-
-    df = pd.DataFrame(data)
+    n_normal = int(n_samples * 0.9)
+    n_anomaly = n_samples - n_normal
+    
+    # Every row starts from the stable baseline, anomalies are overwritten below
+    risk = np.random.uniform(0.0, 0.3, n_samples)              # Low risk
+    code_change = np.zeros(n_samples, dtype=np.int64)          # No code change
+    liquidity = np.random.uniform(100000, 500000, n_samples)   # Stable liquidity
+    holders = np.random.randint(100, 1000, n_samples)          # Normal holders
+    is_anomaly = np.concatenate([
+        np.zeros(n_normal, dtype=np.int64),
+        np.ones(n_anomaly, dtype=np.int64)
+    ])
+    
+    # Randomly choose anomaly type: 0 = risk_spike, 1 = code_change, 2 = rug_pull
+    drift_type = np.full(n_samples, -1)
+    drift_type[n_normal:] = np.random.randint(0, 3, n_anomaly)
+    
+    risk_spike = drift_type == 0
+    risk[risk_spike] = np.random.uniform(0.7, 1.0, risk_spike.sum())
+    code_change[drift_type == 1] = 1
+    rug_pull = drift_type == 2
+    liquidity[rug_pull] = np.random.uniform(0, 1000, rug_pull.sum())  # Liquidity drained
+    
+    df = pd.DataFrame({
+        'Sim_RiskScore': risk,
+        'Capability_Hash_Distance': code_change,
+        'Liquidity_Amount': liquidity,
+        'Unique_Holders_Count': holders,
+        'is_anomaly': is_anomaly
+    })
     return df
 
 def train_drift_model():
@@ -77,7 +72,8 @@ def train_drift_model():
     df.to_csv(data_path, index=False)
     print(f"✓ Saved drift dataset to: {data_path}")
     
-    X = df[FEATURE_COLS]
+    # Float32 ndarray so sklearn doesn't re-validate/copy the DataFrame
+    X = df[FEATURE_COLS].to_numpy(dtype=np.float32, copy=False)
     y = df['is_anomaly']
     
     # Train Isolation Forest on mostly normal data
@@ -85,7 +81,9 @@ def train_drift_model():
     model = IsolationForest(
         contamination=0.1,
         random_state=42,
-        n_estimators=100
+        n_estimators=100,
+        n_jobs=-1,        # Build trees in parallel
+        max_samples=256   # Small per-tree working set (paper default)
     )
     
     model.fit(X)
@@ -109,7 +107,7 @@ def train_drift_model():
         'Unique_Holders_Count': 500
     }])
     
-    pred = model.predict(rug_pull)[0] # -1 = Anomaly
+    pred = model.predict(rug_pull.to_numpy(dtype=np.float32))[0] # -1 = Anomaly
     print(f"Rug Pull (Liquidity Drop): {'Anomaly (-1)' if pred == -1 else 'Normal (1)'} {'✅' if pred == -1 else '❌'}")
     
     code_change = pd.DataFrame([{
@@ -118,7 +116,7 @@ def train_drift_model():
         'Liquidity_Amount': 200000.0,
         'Unique_Holders_Count': 500
     }])
-    pred_cc = model.predict(code_change)[0]
+    pred_cc = model.predict(code_change.to_numpy(dtype=np.float32))[0]
     print(f"Code Change: {'Anomaly (-1)' if pred_cc == -1 else 'Normal (1)'} {'✅' if pred_cc == -1 else '❌'}")
 
     
@@ -126,7 +124,8 @@ def train_drift_model():
     models_dir = os.path.join(BASE_DIR, "models")
     os.makedirs(models_dir, exist_ok=True)
     model_path = os.path.join(models_dir, "drift_detector.pkl")
-    joblib.dump(model, model_path)
+    # Uncompressed so the API can memory-map it (joblib.load(mmap_mode='r'))
+    joblib.dump(model, model_path, compress=0)
     print(f"\n✓ Model saved to: {model_path}")
 
 if __name__ == "__main__":
@@ -96,18 +96,21 @@ def train_drift_detector():
     print(f"  Normal: {sum(y == 0)}, Anomaly: {sum(y == 1)}")
     
     # Train Isolation Forest on normal data only
-    X_normal = X[y == 0]
+    # Fit on a float32 ndarray so sklearn doesn't re-validate/copy the DataFrame
+    X_normal = df.loc[y == 0, feature_cols].to_numpy(dtype=np.float32, copy=False)
     
     model = IsolationForest(
         contamination=0.1,  # Expect 10% anomalies
         random_state=42,
-        n_estimators=100
+        n_estimators=100,
+        n_jobs=-1,          # Build trees in parallel
+        max_samples=256     # Small per-tree working set (paper default)
     )
     
     model.fit(X_normal)
     
     # Evaluate on full dataset
-    predictions = model.predict(X)  # Returns 1 for normal, -1 for anomaly
+    predictions = model.predict(X.to_numpy(dtype=np.float32, copy=False))  # Returns 1 for normal, -1 for anomaly
     
     # Convert to binary (0 = normal, 1 = anomaly)
     predictions_binary = (predictions == -1).astype(int)
@@ -122,7 +125,8 @@ def train_drift_detector():
     # Save model using joblib
     import joblib
     model_path = os.path.join(BASE_DIR, "models", "drift_detector.pkl")
-    joblib.dump(model, model_path)
+    # Uncompressed so the API can memory-map it (joblib.load(mmap_mode='r'))
+    joblib.dump(model, model_path, compress=0)
     print(f"\n✓ Model saved to: {model_path}")
     
     return model